@@ -5,32 +5,53 @@
 на Twisted/Klein с неблокирующим доступом к Postgres (txpostgres).
 """
 
+if __name__ == "__main__":
+    # epoll-реактор ставится явно и только при запуске сервиса, до
+    # первого импорта `twisted.internet.reactor` (его делает klein).
+    # Вне Linux остаётся реактор по умолчанию.
+    try:
+        from twisted.internet import epollreactor
+    except ImportError:
+        pass
+    else:
+        epollreactor.install()
+
 from typing import Any, Dict
 
 import json
+import sys
 import yaml
 from klein import Klein
-from twisted.internet import defer, reactor
+from twisted.internet import defer, reactor, threads
+from twisted.python import log
 from twisted.web.server import Site
 
+from app import jsonutil
+from app.cache import config_cache, etag_matches, make_etag
 from app.errors import (
     BadRequest,
     NotFound,
     UnprocessableEntity,
 )
 from app.settings import settings
-from app.templating import render_config
+from app.templating import render_config, warm_templates
 from app.validation import validate_config_payload
 from app.db import (
     get_config,
     get_history,
-    get_latest_version,
     insert_config,
+    insert_config_autoversion,
     pool,
     start_pool,
     stop_pool,
 )
 
+try:
+    # libyaml-сканер на C; PyYAML не выбирает его автоматически.
+    from yaml import CSafeLoader as _YLoader
+except ImportError:  # pragma: no cover - сборка PyYAML без libyaml
+    from yaml import SafeLoader as _YLoader
+
 app = Klein()
 
 
@@ -38,13 +59,20 @@ def _json(
     request,
     status: int = 200,
     body: Dict[str, Any] | list | None = None,
+    raw: bytes | None = None,
 ):
     """Сериализует ответ в JSON и проставляет заголовки.
 
+    Длина тела известна заранее, поэтому выставляется
+    `Content-Length`: Klein отдаёт ответ одной записью, и Twisted не
+    переходит на chunked-кодирование.
+
     Args:
       request: Объект Klein/Twisted запроса.
       status (int): Код HTTP-статуса.
       body (dict | list | None): Тело ответа.
+      raw (bytes | None): Готовый JSON (например, из БД); если задан,
+        отдаётся как есть без сериализации `body`.
 
     Returns:
       bytes: JSON-представление тела ответа.
@@ -54,11 +82,103 @@ def _json(
         b"application/json; charset=utf-8",
     )
     request.setResponseCode(status)
-    payload = body if body is not None else {}
-    return json.dumps(
-        payload,
-        ensure_ascii=False,
-    ).encode("utf-8")
+    if raw is None:
+        raw = jsonutil.dumps(body if body is not None else {})
+    request.setHeader(b"Content-Length", b"%d" % len(raw))
+    return raw
+
+
+def _fetch_config(service: str, version: int | None):
+    """Читает конфигурацию через кеш версий.
+
+    Конкретные версии неизменяемы, поэтому берутся из `config_cache`
+    без обращения к БД и без Deferred. Последняя версия всегда
+    читается из БД, но результат кладётся в кеш под своим
+    фактическим номером.
+
+    Args:
+      service (str): Идентификатор сервиса.
+      version (int | None): Номер версии или None (последняя).
+
+    Returns:
+      tuple[bytes, bytes] | Deferred: Сырой JSON конфигурации и его
+      ETag — сразу при попадании в кеш, иначе через Deferred.
+
+    Raises:
+      NotFound: Сервис/версия не найдены (через Deferred).
+    """
+    if version is not None:
+        cached = config_cache.get((service, version))
+        if cached is not None:
+            return cached
+
+    def _store(row):
+        if not row:
+            raise NotFound()
+        ver, raw_payload = row
+        entry = (raw_payload, make_etag(raw_payload))
+        config_cache.put((service, ver), entry)
+        return entry
+
+    return get_config(service, version).addCallback(_store)
+
+
+def _then(result, fn, *args):
+    """Применяет `fn` к результату, синхронному или отложенному.
+
+    Позволяет не создавать Deferred там, где ввода-вывода не было.
+
+    Args:
+      result: Готовое значение или Deferred.
+      fn: Функция `fn(value, *args)`.
+      *args: Дополнительные аргументы для `fn`.
+
+    Returns:
+      Any | Deferred: Результат `fn` (в Deferred, если `result` им был).
+    """
+    if isinstance(result, defer.Deferred):
+        return result.addCallback(fn, *args)
+    return fn(result, *args)
+
+
+# Значения query-флага, считающиеся истиной.
+_TRUE_FLAGS = frozenset((b"1", b"true", b"yes"))
+
+
+def _intarg(args, key: bytes) -> int | None:
+    """Читает целочисленный query-параметр.
+
+    Args:
+      args (dict[bytes, list[bytes]]): `request.args`.
+      key (bytes): Имя параметра.
+
+    Returns:
+      int | None: Значение параметра или None, если он не передан.
+
+    Raises:
+      BadRequest: Значение не является целым числом.
+    """
+    values = args.get(key)
+    if not values:
+        return None
+    try:
+        return int(values[0])
+    except ValueError:
+        raise BadRequest(f"{key.decode()} must be integer")
+
+
+def _flagarg(args, key: bytes) -> bool:
+    """Читает булев query-флаг (`1`, `true` или `yes`).
+
+    Args:
+      args (dict[bytes, list[bytes]]): `request.args`.
+      key (bytes): Имя параметра.
+
+    Returns:
+      bool: True, если флаг передан и включён.
+    """
+    values = args.get(key)
+    return bool(values) and values[0] in _TRUE_FLAGS
 
 
 def _read_body(request) -> bytes:
@@ -127,7 +247,7 @@ def post_config(request, service: str):
         raise BadRequest("empty body")
 
     try:
-        data = yaml.safe_load(raw.decode("utf-8"))
+        data = yaml.load(raw, Loader=_YLoader)
     except yaml.YAMLError as e:
         raise BadRequest(f"YAML parse error: {e}")
 
@@ -138,19 +258,19 @@ def post_config(request, service: str):
     if errors:
         raise UnprocessableEntity(errors)
 
+    # Компиляция и запись байткода на диск — вне потока реактора;
+    # ответ её не ждёт.
+    threads.deferToThread(warm_templates, data).addErrback(log.err)
     version = data.get("version")
     if version is None:
-        maxv = yield get_latest_version(service)
-        version = 1 if maxv is None else maxv + 1
-        data["version"] = version
-
-    _ = yield insert_config(service, version, data)
+        version = yield insert_config_autoversion(service, data)
+    else:
+        _ = yield insert_config(service, version, data)
     body = {"service": service, "version": version, "status": "saved"}
     defer.returnValue(_json(request, 200, body))
 
 
 @app.route("/config/<service>", methods=["GET"])
-@defer.inlineCallbacks
 def get_config_route(request, service: str):
     """Возвращает конфигурацию сервиса.
 
@@ -159,6 +279,9 @@ def get_config_route(request, service: str):
       * `template=1` — рендер значений через Jinja2. Контекст
         берётся из JSON-тела запроса (для совместимости с ТЗ).
 
+    Ответ без рендера снабжается заголовком `ETag`; при совпадении с
+    `If-None-Match` возвращается 304 без тела.
+
     Args:
       request: Объект запроса.
       service (str): Идентификатор сервиса.
@@ -171,42 +294,49 @@ def get_config_route(request, service: str):
       NotFound: Сервис/версия не найдены.
       UnprocessableEntity: Ошибка рендера шаблона.
     """
-    args = request.args
-    version = None
-    if b"version" in args:
-        try:
-            version = int(args[b"version"][0].decode())
-        except ValueError:
-            raise BadRequest("version must be integer")
-
-    row = yield get_config(service, version)
-    if not row:
-        raise NotFound()
-
-    _ver, payload = row
-    if isinstance(payload, (bytes, bytearray)):
-        payload = json.loads(payload.decode())
-    elif isinstance(payload, str):
-        payload = json.loads(payload)
-    elif not isinstance(payload, dict):
-        payload = json.loads(json.dumps(payload))
-
-    if args.get(b"template", [b"0"])[0] == b"1":
-        ctx_bytes = _read_body(request)
-        context = {}
-        if ctx_bytes:
-            try:
-                context = json.loads(ctx_bytes.decode("utf-8"))
-            except json.JSONDecodeError as e:
-                raise BadRequest(
-                    f"Invalid JSON body for template context: {e}"
-                )
+    version = _intarg(request.args, b"version")
+
+    return _then(_fetch_config(service, version), _finish_get, request)
+
+
+def _finish_get(entry, request):
+    """Формирует ответ `GET /config/<service>` по данным конфигурации.
+
+    Args:
+      entry (tuple[bytes, bytes]): Сырой JSON конфигурации и ETag.
+      request: Объект запроса.
+
+    Returns:
+      bytes: JSON-объект конфигурации (или пустое тело для 304).
+
+    Raises:
+      BadRequest: Некорректный JSON-контекст шаблона.
+      UnprocessableEntity: Ошибка рендера шаблона.
+    """
+    raw_payload, etag = entry
+    if not _flagarg(request.args, b"template"):
+        # Без рендера JSON из БД отдаётся как есть, без разбора.
+        request.setHeader(b"ETag", etag)
+        if etag_matches(request.getHeader(b"If-None-Match"), etag):
+            request.setResponseCode(304)
+            return b""
+        return _json(request, 200, raw=raw_payload)
+
+    ctx_bytes = _read_body(request)
+    context = {}
+    if ctx_bytes:
         try:
-            payload = render_config(payload, context)
-        except ValueError as e:
-            raise UnprocessableEntity([str(e)])
+            context = jsonutil.loads(ctx_bytes)
+        except json.JSONDecodeError as e:
+            raise BadRequest(
+                f"Invalid JSON body for template context: {e}"
+            )
+    try:
+        payload = render_config(jsonutil.loads(raw_payload), context)
+    except ValueError as e:
+        raise UnprocessableEntity([str(e)])
 
-    defer.returnValue(_json(request, 200, payload))
+    return _json(request, 200, payload)
 
 
 @app.route("/config/<service>/history", methods=["GET"])
@@ -221,9 +351,8 @@ def get_history_route(request, service: str):
     Returns:
       bytes: JSON-массив объектов `{version, created_at}`.
     """
-    items = yield get_history(service, limit=50)
-    body = [{"version": v, "created_at": ts} for v, ts in items]
-    defer.returnValue(_json(request, 200, body))
+    raw = yield get_history(service, limit=50)
+    defer.returnValue(_json(request, 200, raw=raw))
 
 
 # ---------- Convenience endpoints ----------------------------------
@@ -280,7 +409,6 @@ def health(request):
 
 
 @app.route("/config/<service>/render", methods=["POST"])
-@defer.inlineCallbacks
 def render_config_route(request, service: str):
     """Рендер конфигурации через POST.
 
@@ -299,27 +427,35 @@ def render_config_route(request, service: str):
       NotFound: Сервис/версия не найдены.
       UnprocessableEntity: Ошибка рендера.
     """
-    args = request.args
-    version = None
-    if b"version" in args:
-        try:
-            version = int(args[b"version"][0].decode())
-        except ValueError:
-            raise BadRequest("version must be integer")
+    version = _intarg(request.args, b"version")
 
-    row = yield get_config(service, version)
-    if not row:
-        raise NotFound()
+    return _then(
+        _fetch_config(service, version),
+        _finish_render,
+        request,
+    )
 
-    _ver, payload = row
-    if isinstance(payload, (bytes, bytearray)):
-        payload = json.loads(payload.decode())
-    elif isinstance(payload, str):
-        payload = json.loads(payload)
+
+def _finish_render(entry, request):
+    """Рендерит конфигурацию по JSON-контексту из тела запроса.
+
+    Args:
+      entry (tuple[bytes, bytes]): Сырой JSON конфигурации и ETag.
+      request: Объект запроса.
+
+    Returns:
+      bytes: JSON сконфигурированного объекта.
+
+    Raises:
+      BadRequest: Некорректный JSON-контекст.
+      UnprocessableEntity: Ошибка рендера.
+    """
+    raw_payload, _etag = entry
+    payload = jsonutil.loads(raw_payload)
 
     raw = _read_body(request)
     try:
-        context = json.loads(raw.decode("utf-8")) if raw else {}
+        context = jsonutil.loads(raw) if raw else {}
     except json.JSONDecodeError as e:
         raise BadRequest(
             f"Invalid JSON body for template context: {e}"
@@ -330,14 +466,18 @@ def render_config_route(request, service: str):
     except ValueError as e:
         raise UnprocessableEntity([str(e)])
 
-    defer.returnValue(_json(request, 200, rendered))
+    return _json(request, 200, rendered)
 
 
 # ---------- Runner --------------------------------------------------
 
 
 def run():
-    """Запускает приложение: БД-пул, HTTP-сервер и Twisted reactor."""
+    """Запускает приложение: БД-пул, HTTP-сервер и Twisted reactor.
+
+    Если старт пула или сервера не удался, реактор останавливается,
+    а процесс завершается с кодом 1.
+    """
     d = start_pool()
 
     def _started(_):
@@ -345,9 +485,22 @@ def run():
         site = Site(app.resource())
         reactor.listenTCP(settings.port, site)
 
+    failed = []
+
+    def _failed(failure):
+        # Без этого процесс остался бы жив, но так и не начал слушать
+        # порт (например, PREPARE упал до применения миграций).
+        print("Startup failed:", file=sys.stderr)
+        failure.printTraceback(sys.stderr)
+        failed.append(failure)
+        reactor.stop()
+
     d.addCallback(_started)
+    d.addErrback(_failed)
     reactor.addSystemEventTrigger("before", "shutdown", stop_pool)
     reactor.run()
+    if failed:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
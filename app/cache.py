@@ -0,0 +1,100 @@
+"""In-process кеш сохранённых конфигураций.
+
+Конфигурация неизменяема после записи (новая запись получает новую
+версию), поэтому пара `(service, version)` однозначно определяет
+тело ответа. Кеш хранит сырой JSON из БД вместе с его ETag.
+"""
+
+from collections import OrderedDict
+import hashlib
+from typing import Generic, Hashable, Optional, TypeVar
+
+from app.settings import settings
+
+V = TypeVar("V")
+
+
+class LRUCache(Generic[V]):
+    """Простой LRU-кеш фиксированного размера.
+
+    Attributes:
+      maxsize (int): Максимальное число элементов.
+    """
+
+    def __init__(self, maxsize: int):
+        """Создаёт пустой кеш.
+
+        Args:
+          maxsize (int): Максимальное число элементов.
+        """
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, V]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[V]:
+        """Возвращает значение и помечает его как недавно использованное.
+
+        Args:
+          key: Ключ.
+
+        Returns:
+          Значение или None, если ключа нет.
+        """
+        try:
+            self._data.move_to_end(key)
+        except KeyError:
+            return None
+        return self._data[key]
+
+    def put(self, key: Hashable, value: V) -> None:
+        """Кладёт значение, вытесняя самый старый элемент при переполнении.
+
+        Args:
+          key: Ключ.
+          value: Значение.
+        """
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        """Возвращает число элементов в кеше."""
+        return len(self._data)
+
+
+def make_etag(raw: bytes) -> bytes:
+    """Вычисляет сильный ETag по телу ответа.
+
+    Args:
+      raw (bytes): Тело ответа.
+
+    Returns:
+      bytes: Значение заголовка ETag в кавычках.
+    """
+    digest = hashlib.blake2b(raw, digest_size=8).hexdigest()
+    return f'"{digest}"'.encode("ascii")
+
+
+def etag_matches(if_none_match: Optional[bytes], etag: bytes) -> bool:
+    """Проверяет заголовок If-None-Match против ETag.
+
+    Args:
+      if_none_match (bytes | None): Значение заголовка запроса.
+      etag (bytes): Текущий ETag ресурса.
+
+    Returns:
+      bool: True, если клиент уже имеет актуальную версию.
+    """
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(b","):
+        tag = tag.strip()
+        if tag == b"*" or tag.removeprefix(b"W/") == etag:
+            return True
+    return False
+
+
+# Кеш (service, version) -> (raw JSON, ETag).
+config_cache: LRUCache[tuple[bytes, bytes]] = LRUCache(
+    settings.config_cache_size
+)
@@ -4,30 +4,83 @@
 `configurations`. Все вызовы асинхронные (Twisted/Deferred).
 """
 
-from typing import Any, Dict, List, Optional, Tuple
-import json
+from typing import Any, Dict, Optional, Tuple
 
 from txpostgres import txpostgres
 from twisted.internet import defer
 
+from app import jsonutil
 from app.settings import settings
 
 
 # Пул соединений к Postgres. Запускается в `start_pool()`.
+# Пул txpostgres фиксированного размера: все `min` соединений
+# открываются в `start()`, запросы распределяются между ними.
 pool: txpostgres.ConnectionPool = txpostgres.ConnectionPool(
     None,
     dsn=settings.pg_dsn,
+    min=settings.pg_pool_min,
 )
 
+# Серверные prepared statements: имя -> (типы параметров, запрос).
+# Готовятся на каждом соединении пула в `start_pool()`, поэтому
+# разбор и планирование выполняются один раз за жизнь соединения.
+PREPARED: Dict[str, Tuple[str, str]] = {
+    "ins_cfg": (
+        "text, int, jsonb",
+        "INSERT INTO configurations(service, version, payload) "
+        "VALUES ($1, $2, $3) RETURNING id",
+    ),
+    "ins_cfg_auto": (
+        "text, jsonb",
+        "INSERT INTO configurations(service, version, payload) "
+        "SELECT $1, v, $2 || jsonb_build_object('version', v) "
+        "FROM (SELECT COALESCE(MAX(version), 0) + 1 AS v "
+        "FROM configurations WHERE service=$1) AS next "
+        "RETURNING version",
+    ),
+    "sel_cfg_latest": (
+        "text",
+        "SELECT version, payload::text FROM configurations "
+        "WHERE service=$1 ORDER BY version DESC LIMIT 1",
+    ),
+    "sel_cfg_ver": (
+        "text, int",
+        "SELECT version, payload::text FROM configurations "
+        "WHERE service=$1 AND version=$2",
+    ),
+    "sel_hist": (
+        "text, int",
+        "SELECT COALESCE(jsonb_agg(jsonb_build_object("
+        "'version', version, 'created_at', created_at_iso"
+        ") ORDER BY created_at DESC), '[]')::text "
+        "FROM (SELECT version, created_at, created_at_iso "
+        "FROM configurations "
+        "WHERE service=$1 "
+        "ORDER BY created_at DESC "
+        "LIMIT $2) AS h",
+    ),
+}
+
+# Диапазон колонки `version` (INTEGER).
+_VERSION_MIN, _VERSION_MAX = -(2**31), 2**31 - 1
+
 
 @defer.inlineCallbacks
 def start_pool():
     """Стартует пул соединений к БД.
 
+    Открывает сразу все соединения пула, чтобы под нагрузкой не было
+    всплеска подключений, и готовит на каждом из них запросы из
+    `PREPARED`.
+
     Returns:
       Deferred: завершается после успешного старта пула.
     """
     yield pool.start()
+    for conn in pool.connections:
+        for name, (types, sql) in PREPARED.items():
+            yield conn.runOperation(f"PREPARE {name}({types}) AS {sql}")
 
 
 @defer.inlineCallbacks
@@ -46,13 +99,17 @@ def stop_pool(_=None):
 def json_dumps(d: Dict[str, Any]) -> str:
     """Сериализует словарь в компактный JSON.
 
+    Нестроковые ключи (например, числовые из YAML) приводятся к
+    строкам; целые больше 64 бит и глубокая вложенность
+    сериализуются через stdlib `json` (см. `app.jsonutil`).
+
     Args:
       d (dict[str, Any]): Данные для сериализации.
 
     Returns:
       str: JSON-строка без лишних пробелов.
     """
-    return json.dumps(d, ensure_ascii=False, separators=(",", ":"))
+    return jsonutil.dumps(d).decode("utf-8")
 
 
 @defer.inlineCallbacks
@@ -67,77 +124,75 @@ def insert_config(service: str, version: int, payload: Dict[str, Any]):
     Returns:
       int: Идентификатор вставленной записи.
     """
-    q = (
-        "INSERT INTO configurations(service, version, payload) "
-        "VALUES (%s, %s, %s::jsonb) RETURNING id;"
-    )
+    q = "EXECUTE ins_cfg(%s, %s, %s::jsonb)"
     res = yield pool.runQuery(q, (service, version, json_dumps(payload)))
     defer.returnValue(res[0][0])
 
 
 @defer.inlineCallbacks
-def get_latest_version(service: str) -> Optional[int]:
-    """Возвращает максимальную версию для сервиса.
+def insert_config_autoversion(service: str, payload: Dict[str, Any]):
+    """Вставляет конфигурацию с версией `max(version)+1` одним запросом.
+
+    Версия вычисляется в самой вставке, без отдельного запроса
+    `MAX(version)`. Назначенная версия также
+    записывается в поле `version` сохраняемого payload.
 
     Args:
       service (str): Идентификатор сервиса.
+      payload (dict[str, Any]): Тело конфигурации без `version`.
 
     Returns:
-      Optional[int]: Максимальная версия или None, если записей нет.
+      int: Назначенный номер версии.
     """
-    q = "SELECT MAX(version) FROM configurations WHERE service=%s"
-    res = yield pool.runQuery(q, (service,))
-    maxv = res[0][0]
-    defer.returnValue(maxv if maxv is not None else None)
+    q = "EXECUTE ins_cfg_auto(%s, %s::jsonb)"
+    res = yield pool.runQuery(q, (service, json_dumps(payload)))
+    defer.returnValue(res[0][0])
 
 
 @defer.inlineCallbacks
 def get_config(service: str, version: Optional[int]):
     """Читает конфигурацию сервиса.
 
-    При `version=None` возвращает последнюю версию.
+    При `version=None` возвращает последнюю версию. Payload
+    возвращается JSON-текстом в байтах, чтобы его можно было отдать
+    клиенту без разбора и повторной сериализации.
 
     Args:
       service (str): Идентификатор сервиса.
       version (Optional[int]): Номер версии или None.
 
     Returns:
-      Optional[tuple[int, Any]]: Кортеж (version, payload) или None.
+      Optional[tuple[int, bytes]]: Кортеж (version, payload) или None.
     """
     if version is None:
-        q = (
-            "SELECT version, payload FROM configurations "
-            "WHERE service=%s ORDER BY version DESC LIMIT 1"
-        )
+        q = "EXECUTE sel_cfg_latest(%s)"
         res = yield pool.runQuery(q, (service,))
+    elif not _VERSION_MIN <= version <= _VERSION_MAX:
+        # Такой версии быть не может, а параметр int её не примет.
+        defer.returnValue(None)
     else:
-        q = (
-            "SELECT version, payload FROM configurations "
-            "WHERE service=%s AND version=%s"
-        )
+        q = "EXECUTE sel_cfg_ver(%s, %s)"
         res = yield pool.runQuery(q, (service, version))
-    defer.returnValue(res[0] if res else None)
+    if not res:
+        defer.returnValue(None)
+    ver, payload = res[0]
+    defer.returnValue((ver, payload.encode("utf-8")))
 
 
 @defer.inlineCallbacks
-def get_history(service: str, limit: int = 20) -> List[Tuple[int, str]]:
+def get_history(service: str, limit: int = 20):
     """Возвращает историю версий для сервиса.
 
+    JSON-массив собирается в самом Postgres, поэтому его можно отдать
+    клиенту без обхода строк в Python.
+
     Args:
       service (str): Идентификатор сервиса.
       limit (int): Максимальное число элементов истории.
 
     Returns:
-      list[tuple[int, str]]: Список (version, created_at_iso).
+      bytes: JSON-массив объектов `{version, created_at}`.
     """
-    q = (
-        "SELECT version, "
-        "to_char(created_at AT TIME ZONE 'UTC', "
-        "'YYYY-MM-DD\"T\"HH24:MI:SS\"Z\"') "
-        "FROM configurations "
-        "WHERE service=%s "
-        "ORDER BY created_at DESC "
-        "LIMIT %s"
-    )
+    q = "EXECUTE sel_hist(%s, %s)"
     res = yield pool.runQuery(q, (service, limit))
-    defer.returnValue([(row[0], row[1]) for row in res])
+    defer.returnValue(res[0][0].encode("utf-8"))
@@ -0,0 +1,67 @@
+"""JSON-сериализация на orjson с откатом на stdlib `json`.
+
+orjson быстрее, но уже stdlib по допустимым входам: не сериализует
+целые вне 64 бит и вложенность глубже 254 уровней, а такие целые
+при разборе молча превращает во float. YAML и jsonb эти значения
+допускают, поэтому в этих случаях используется stdlib `json`.
+
+Нечисловые float (`inf`, `nan`) orjson пишет как `null` без ошибки,
+поэтому входные данные должны быть проверены заранее (см.
+`app.validation.validate_config_payload`).
+"""
+
+import json
+import re
+from typing import Any
+
+import orjson
+
+# Целое из 19+ цифр может не поместиться в 64 бита; orjson разобрал
+# бы его во float. Совпадение внутри строки лишь включает stdlib.
+_LONG_NUMBER = re.compile(rb"\d{19,}")
+
+
+def dumps(obj: Any) -> bytes:
+    """Сериализует значение в компактный JSON (UTF-8).
+
+    Нестроковые ключи приводятся к строкам, как в stdlib `json`.
+
+    Args:
+      obj: JSON-совместимое значение.
+
+    Returns:
+      bytes: JSON-представление значения.
+
+    Raises:
+      TypeError: Значение не сериализуется в JSON.
+    """
+    try:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    except orjson.JSONEncodeError:
+        return json.dumps(
+            obj,
+            ensure_ascii=False,
+            separators=(",", ":"),
+        ).encode("utf-8")
+
+
+def loads(raw: bytes) -> Any:
+    """Разбирает JSON без потери точности больших целых.
+
+    Args:
+      raw (bytes): JSON-документ.
+
+    Returns:
+      Any: Разобранное значение.
+
+    Raises:
+      json.JSONDecodeError: Невалидный JSON.
+    """
+    if not _LONG_NUMBER.search(raw):
+        return orjson.loads(raw)
+    try:
+        text = raw.decode("utf-8")
+    except UnicodeDecodeError as e:
+        # Как и orjson, невалидный UTF-8 считаем ошибкой разбора.
+        raise json.JSONDecodeError(str(e), "", 0) from e
+    return json.loads(text)
@@ -8,6 +8,3 @@ CREATE TABLE IF NOT EXISTS configurations (
 
 CREATE UNIQUE INDEX IF NOT EXISTS ux_configurations_service_version
   ON configurations(service, version);
-
-CREATE INDEX IF NOT EXISTS ix_configurations_service_created_at
-  ON configurations(service, created_at DESC);
@@ -0,0 +1,27 @@
+-- ISO-представление created_at хранится рядом с ним, чтобы история
+-- не форматировала время на каждом чтении. Генерируемая колонка
+-- невозможна (to_char не IMMUTABLE), поэтому значение задаётся
+-- DEFAULT'ом: now() в обоих DEFAULT'ах — время начала транзакции,
+-- так что created_at и created_at_iso совпадают.
+ALTER TABLE configurations
+  ADD COLUMN IF NOT EXISTS created_at_iso TEXT;
+
+UPDATE configurations
+  SET created_at_iso = to_char(
+    created_at AT TIME ZONE 'UTC', 'YYYY-MM-DD"T"HH24:MI:SS"Z"'
+  )
+  WHERE created_at_iso IS NULL;
+
+ALTER TABLE configurations
+  ALTER COLUMN created_at_iso
+  SET DEFAULT to_char(
+    now() AT TIME ZONE 'UTC', 'YYYY-MM-DD"T"HH24:MI:SS"Z"'
+  );
+
+-- Покрывающий индекс: история читается index-only scan'ом.
+CREATE INDEX IF NOT EXISTS ix_configurations_history
+  ON configurations(service, created_at DESC)
+  INCLUDE (version, created_at_iso);
+
+-- Ключ совпадает с новым индексом; старый только удорожает вставку.
+DROP INDEX IF EXISTS ix_configurations_service_created_at;
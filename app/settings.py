@@ -1,7 +1,8 @@
 """Настройки приложения.
 
-Читает переменные окружения `PG_DSN` и `PORT` и предоставляет
-объект настроек для остальных модулей.
+Читает переменные окружения `PG_DSN`, `PG_POOL_MIN`, `PORT`,
+`JINJA_BCC_DIR`, `JINJA_BCC_MAX_FILES` и `CONFIG_CACHE_SIZE` и
+предоставляет объект настроек для остальных модулей.
 """
 
 from dataclasses import dataclass
@@ -14,7 +15,12 @@ class Settings:
 
     Attributes:
       pg_dsn: Строка подключения к Postgres.
+      pg_pool_min: Число соединений в пуле (открываются при старте).
       port: Порт HTTP-сервера.
+      jinja_bcc_dir: Каталог байткод-кеша шаблонов Jinja2; пустая
+        строка — приватный каталог, который выбирает сама Jinja2.
+      jinja_bcc_max_files: Предел числа файлов в байткод-кеше.
+      config_cache_size: Размер in-process кеша версий конфигураций.
     """
 
     pg_dsn: str = os.getenv(
@@ -22,7 +28,13 @@ class Settings:
         "dbname=configs user=postgres password=postgres "
         "host=db port=5432",
     )
+    pg_pool_min: int = int(os.getenv("PG_POOL_MIN", "10"))
     port: int = int(os.getenv("PORT", "8080"))
+    jinja_bcc_dir: str = os.getenv("JINJA_BCC_DIR", "")
+    jinja_bcc_max_files: int = int(
+        os.getenv("JINJA_BCC_MAX_FILES", "10000")
+    )
+    config_cache_size: int = int(os.getenv("CONFIG_CACHE_SIZE", "1024"))
 
 
 settings = Settings()
@@ -1,25 +1,211 @@
 """Шаблонизация конфигураций через Jinja2.
 
-Модуль выполняет рекурсивный рендер конфигурации.
+Модуль выполняет рендер конфигурации с обходом всей вложенности.
 Рендерятся только строковые значения, которые содержат шаблонные
 конструкции Jinja2 (`{{ ... }}` или `{% ... %}`).
 Включён StrictUndefined, поэтому обращение к отсутствующим
 переменным вызывает ошибку.
+
+Скомпилированные шаблоны кешируются в процессе (`_compile`) и на
+диске через байткод-кеш Jinja2, который переживает рестарт воркеров.
+Семантика та же, что у `Environment.from_string`: у окружения нет
+загрузчика, поэтому `include`/`extends`/`import` недоступны.
 """
 
-from typing import Any, Dict
+import os
+import stat
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from jinja2 import (
+    Environment,
+    FileSystemBytecodeCache,
+    StrictUndefined,
+    Template,
+    TemplateError,
+)
+from twisted.python import log
 
-from jinja2 import Environment, StrictUndefined, TemplateError
+from app import jsonutil
+from app.settings import settings
 
 env = Environment(undefined=StrictUndefined, autoescape=False)
 
 
+def _private_dir(path: str) -> str:
+    """Создаёт каталог с правами 0700 и проверяет, что он наш.
+
+    Из кеша загружается байткод, поэтому каталог, доступный на
+    запись другим пользователям, позволил бы подменить код шаблонов.
+
+    Args:
+      path: Путь к каталогу.
+
+    Returns:
+      str: Тот же путь.
+
+    Raises:
+      OSError: Каталог не создаётся, принадлежит другому
+        пользователю или доступен на запись группе/остальным.
+    """
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    st = os.lstat(path)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid():
+        raise OSError(f"{path} is not a directory owned by us")
+    if st.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+        raise OSError(f"{path} is writable by group or others")
+    return path
+
+
+# Байткод-кеш не подключён к `env` (его использует только загрузчик):
+# корзины для строковых шаблонов ищутся вручную, ключ — сам исходник.
+@lru_cache(maxsize=1)
+def _bytecode_cache() -> Optional[FileSystemBytecodeCache]:
+    """Лениво создаёт файловый байткод-кеш.
+
+    Без `JINJA_BCC_DIR` Jinja2 сама выбирает приватный каталог
+    пользователя во временной директории и проверяет его права.
+
+    Returns:
+      FileSystemBytecodeCache | None: Кеш байткода шаблонов или
+      None, если каталог недоступен (шаблоны тогда компилируются
+      без дискового кеша).
+    """
+    try:
+        if not settings.jinja_bcc_dir:
+            return FileSystemBytecodeCache()
+        return FileSystemBytecodeCache(
+            directory=_private_dir(settings.jinja_bcc_dir)
+        )
+    except (OSError, RuntimeError) as e:
+        log.msg(f"Jinja2 bytecode cache disabled: {e}")
+        return None
+
+
+@lru_cache(maxsize=1024)
+def _compile(src: str) -> Template:
+    """Компилирует строку-шаблон с кешированием по исходному тексту.
+
+    Эквивалент `env.from_string(src)`, но сначала ищет готовый
+    байткод на диске. Сам кеш здесь только читается; запись делает
+    `warm_templates`.
+
+    Args:
+      src: Исходный текст шаблона.
+
+    Returns:
+      Template: Скомпилированный шаблон Jinja2.
+
+    Raises:
+      TemplateError: Если шаблон синтаксически некорректен.
+    """
+    bcc = _bytecode_cache()
+    code = None
+    if bcc is not None:
+        code = bcc.get_bucket(env, src, None, src).code
+    if code is None:
+        code = env.compile(src)
+    return env.template_class.from_code(
+        env, code, env.make_globals(None)
+    )
+
+
+def _persist(src: str) -> None:
+    """Сохраняет байткод шаблона на диск, если его там ещё нет.
+
+    Число файлов в каталоге ограничено `settings.jinja_bcc_max_files`.
+
+    Args:
+      src: Исходный текст шаблона.
+
+    Raises:
+      TemplateError: Если шаблон синтаксически некорректен.
+    """
+    bcc = _bytecode_cache()
+    if bcc is None:
+        return
+    bucket = bcc.get_bucket(env, src, None, src)
+    if bucket.code is not None:
+        return
+    if len(os.listdir(bcc.directory)) >= settings.jinja_bcc_max_files:
+        return
+    bucket.code = env.compile(src)
+    bcc.set_bucket(bucket)
+
+
+def warm_templates(data: Any) -> None:
+    """Заранее компилирует все строки-шаблоны конфигурации.
+
+    Прогревает кеш `_compile` и байткод-кеш при сохранении, чтобы
+    первый рендер не платил за компиляцию. Функция делает дисковый
+    ввод-вывод и рассчитана на вызов вне потока реактора.
+    Синтаксические ошибки здесь игнорируются — они по-прежнему
+    вернутся при рендере.
+
+    Args:
+      data: Конфигурация произвольной вложенности.
+    """
+    stack = [data]
+    while stack:
+        val = stack.pop()
+        if isinstance(val, dict):
+            stack.extend(val.values())
+        elif isinstance(val, list):
+            stack.extend(val)
+        elif isinstance(val, str) and ("{{" in val or "{%" in val):
+            try:
+                _persist(val)
+                _compile(val)
+            except (TemplateError, OSError):
+                pass
+
+
+def _render_str(val: str, context: Dict[str, Any]) -> str:
+    """Рендерит одну строку-шаблон через Jinja2.
+
+    Args:
+      val: Строка, содержащая шаблонные конструкции.
+      context: Контекст шаблона (переменные для подстановки).
+
+    Returns:
+      str: Результат рендера.
+
+    Raises:
+      ValueError: Если Jinja2 не может отрендерить строку.
+    """
+    try:
+        return _compile(val).render(**context)
+    except TemplateError as e:  # noqa: BLE001
+        raise ValueError(
+            f"Template render error: {e}"
+        ) from e
+
+
+def _has_marker(obj: Any) -> bool:
+    """Проверяет, есть ли в поддереве хотя бы один маркер шаблона.
+
+    Поддерево сериализуется в плоский буфер байтов, и маркеры ищутся
+    одним проходом `bytes.__contains__` вместо проверки каждого узла.
+
+    Args:
+      obj: Словарь или список произвольной вложенности.
+
+    Returns:
+      bool: True, если встречается `{{` или `{%`.
+    """
+    probe = jsonutil.dumps(obj)
+    return b"{{" in probe or b"{%" in probe
+
+
 def _render(val: Any, context: Dict[str, Any]) -> Any:
-    """Рекурсивно рендерит значение с учётом типа.
+    """Рендерит значение с учётом типа без рекурсии.
 
     Если значение — строка и содержит шаблон, то оно
     рендерится через Jinja2. Списки и словари обходятся
-    рекурсивно.
+    явным стеком: для каждого контейнера создаётся копия,
+    которая заполняется по мере обхода. Вложенные контейнеры
+    без маркеров шаблона (`_has_marker`) не копируются и не
+    обходятся, а переносятся в результат как есть.
 
     Args:
       val: Значение произвольного типа.
@@ -31,23 +217,35 @@ def _render(val: Any, context: Dict[str, Any]) -> Any:
     Raises:
       ValueError: Если Jinja2 не может отрендерить строку.
     """
-    is_str = isinstance(val, str)
-    has_tpl = is_str and ("{{" in val or "{%" in val)
-    if has_tpl:
-        try:
-            return env.from_string(val).render(**context)
-        except TemplateError as e:  # noqa: BLE001
-            raise ValueError(
-                f"Template render error: {e}"
-            ) from e
-
-    if isinstance(val, list):
-        return [_render(x, context) for x in val]
+    t = type(val)
+    if t is str:
+        if "{{" in val or "{%" in val:
+            return _render_str(val, context)
+        return val
+    if t is dict:
+        root: Any = {}
+    elif t is list:
+        root = [None] * len(val)
+    else:
+        return val
 
-    if isinstance(val, dict):
-        return {k: _render(v, context) for k, v in val.items()}
-
-    return val
+    # Пары (копия, исходник); копия заполняется значениями исходника.
+    stack: List[Tuple[Any, Any]] = [(root, val)]
+    while stack:
+        out, src = stack.pop()
+        items = src.items() if type(src) is dict else enumerate(src)
+        for k, v in items:
+            t = type(v)
+            if t is str:
+                if "{{" in v or "{%" in v:
+                    v = _render_str(v, context)
+            elif t is dict or t is list:
+                if _has_marker(v):
+                    child: Any = {} if t is dict else [None] * len(v)
+                    stack.append((child, v))
+                    v = child
+            out[k] = v
+    return root
 
 
 def render_config(
@@ -57,7 +255,9 @@ def render_config(
     """Рендерит всю конфигурацию по заданному контексту.
 
     Обходит словарь целиком и рендерит только строковые
-    значения, в которых есть шаблоны Jinja2.
+    значения, в которых есть шаблоны Jinja2. Если в сериализованной
+    конфигурации нет ни одного маркера шаблона, обход пропускается
+    и возвращается исходный словарь.
 
     Args:
       data: Исходная конфигурация (словарь).
@@ -69,6 +269,9 @@ def render_config(
     Raises:
       ValueError: Если произошла ошибка рендера.
     """
+    if not _has_marker(data):
+        return data
+
     rendered = _render(data, context)
     # Тип сохраняется словарём; _render возвращает Any.
     assert isinstance(rendered, dict)
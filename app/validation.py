@@ -4,9 +4,24 @@
 выполняет дополнительные проверки значений (диапазон порта и
 ненулевой host). Предназначен для первичной валидации YAML,
 преобразованного в словарь.
+
+Сама проверка выполняется скомпилированной схемой pydantic-core
+(`_CONFIG_ADAPTER`); ошибки переводятся в прежние человекочитаемые
+сообщения.
 """
 
-from typing import Any, Dict, List, Tuple, Optional
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import (
+    Field,
+    StrictInt,
+    StrictStr,
+    StringConstraints,
+    TypeAdapter,
+    ValidationError,
+)
+from typing_extensions import Annotated, NotRequired, TypedDict
 
 # Список обязательных полей и ожидаемых типов.
 # Поле `version` опционально: если присутствует, должно быть int.
@@ -17,22 +32,107 @@ REQUIRED_FIELDS: List[Tuple[str, type]] = [
 ]
 
 
-def _dig(d: Dict[str, Any], path: str) -> Optional[Any]:
-    """Достаёт значение по «точечному» пути из словаря.
+# Пути заранее разбиты на части, чтобы не делать `split` на запрос.
+REQUIRED_FIELDS_PARTS: List[Tuple[str, Tuple[str, ...], type]] = [
+    (path, tuple(path.split(".")), expected_type)
+    for path, expected_type in REQUIRED_FIELDS
+]
+
+
+class _DatabaseSchema(TypedDict):
+    """Схема секции `database`."""
+
+    host: Annotated[
+        StrictStr,
+        StringConstraints(strip_whitespace=True, min_length=1),
+    ]
+    port: Annotated[StrictInt, Field(ge=1, le=65535)]
+
+
+class _ConfigSchema(TypedDict):
+    """Схема конфигурации; неизвестные ключи допускаются."""
+
+    version: NotRequired[Optional[StrictInt]]
+    database: _DatabaseSchema
+
+
+_CONFIG_ADAPTER: TypeAdapter[_ConfigSchema] = TypeAdapter(_ConfigSchema)
+
+# Ошибки значений: (путь, тип ошибки pydantic) -> сообщение.
+_VALUE_ERRORS: Dict[Tuple[str, str], str] = {
+    ("database.port", "greater_than_equal"): (
+        "Invalid database.port: must be 1..65535"
+    ),
+    ("database.port", "less_than_equal"): (
+        "Invalid database.port: must be 1..65535"
+    ),
+    ("database.host", "string_too_short"): (
+        "Invalid database.host: must be non-empty string"
+    ),
+}
+
+
+def _messages(err: Dict[str, Any]) -> List[Tuple[int, str]]:
+    """Переводит одну ошибку pydantic в сообщения модуля.
+
+    Args:
+      err: Элемент `ValidationError.errors()`.
+
+    Returns:
+      Пары (порядок, сообщение). Ошибки наличия и типов идут раньше
+      проверок значений, как и до перехода на схему.
+    """
+    parts = tuple(str(p) for p in err["loc"])
+    path = ".".join(parts)
+    kind = err["type"]
+
+    msg = _VALUE_ERRORS.get((path, kind))
+    if msg is not None:
+        order = 1 if path == "database.port" else 2
+        return [(order, msg)]
+
+    exact = any(p == path for p, _, _ in REQUIRED_FIELDS_PARTS)
+    if exact and kind != "missing" and err.get("input") is not None:
+        exp = dict(REQUIRED_FIELDS)[path].__name__
+        return [(0, f"Invalid type for {path}: expected {exp}")]
+
+    # Отсутствует поле или вся его родительская секция не словарь.
+    return [
+        (0, f"Missing required field: {p}")
+        for p, p_parts, _ in REQUIRED_FIELDS_PARTS
+        if p != "version" and p_parts[: len(parts)] == parts
+    ]
+
+
+def _non_finite(doc: Any) -> List[str]:
+    """Находит нечисловые float (`.inf`, `.nan`) во всём документе.
+
+    JSON их не допускает, а orjson молча записал бы `null`, и
+    сохранённая конфигурация разошлась бы с присланной.
 
     Args:
-      d: Исходный словарь.
-      path: Путь вида "a.b.c".
+      doc: Документ произвольной вложенности.
 
     Returns:
-      Значение по пути или None, если путь не существует.
+      Список сообщений об ошибках (по одному на значение).
     """
-    cur: Any = d
-    for part in path.split("."):
-        if not isinstance(cur, dict) or part not in cur:
-            return None
-        cur = cur[part]
-    return cur
+    errors: List[str] = []
+    stack: List[Tuple[str, Any]] = [("", doc)]
+    while stack:
+        path, val = stack.pop()
+        if isinstance(val, dict):
+            items = val.items()
+        elif isinstance(val, list):
+            items = enumerate(val)  # type: ignore[assignment]
+        else:
+            if isinstance(val, float) and not math.isfinite(val):
+                errors.append(
+                    f"Invalid value for {path}: must be a finite number"
+                )
+            continue
+        for k, v in items:
+            stack.append((f"{path}.{k}" if path else str(k), v))
+    return sorted(errors)
 
 
 def validate_config_payload(doc: Dict[str, Any]) -> List[str]:
@@ -42,7 +142,8 @@ def validate_config_payload(doc: Dict[str, Any]) -> List[str]:
       * наличие обязательных полей (кроме опционального `version`);
       * соответствие типов ожидаемым;
       * диапазон порта (1..65535);
-      * непустой строковый `database.host`.
+      * непустой строковый `database.host`;
+      * отсутствие `.inf`/`.nan` в любом месте документа.
 
     Args:
       doc: Словарь конфигурации (из YAML).
@@ -52,22 +153,11 @@ def validate_config_payload(doc: Dict[str, Any]) -> List[str]:
       конфигурация валидна.
     """
     errors: List[str] = []
-
-    for path, expected_type in REQUIRED_FIELDS:
-        val = _dig(doc, path)
-        if val is None and path != "version":
-            errors.append(f"Missing required field: {path}")
-        elif val is not None and not isinstance(val, expected_type):
-            exp = expected_type.__name__
-            errors.append(f"Invalid type for {path}: expected {exp}")
-
-    # Дополнительные проверки значений
-    port = _dig(doc, "database.port")
-    if isinstance(port, int) and not (1 <= port <= 65535):
-        errors.append("Invalid database.port: must be 1..65535")
-
-    host = _dig(doc, "database.host")
-    if isinstance(host, str) and not host.strip():
-        errors.append("Invalid database.host: must be non-empty string")
-
-    return errors
+    try:
+        _CONFIG_ADAPTER.validate_python(doc)
+    except ValidationError as e:
+        found: List[Tuple[int, str]] = []
+        for err in e.errors():
+            found.extend(_messages(dict(err)))
+        errors = [msg for _, msg in sorted(found, key=lambda x: x[0])]
+    return errors + _non_finite(doc)
@@ -0,0 +1,72 @@
+import io
+
+import pytest
+
+from app.api import _finish_get, _flagarg, _intarg
+from app.cache import make_etag
+from app.errors import BadRequest
+
+RAW = b'{"database": {"host": "db", "port": 5432}, "greet": "{{ u }}"}'
+
+
+class FakeRequest:
+    def __init__(self, args=None, headers=None, body=b""):
+        self.args = args or {}
+        self.content = io.BytesIO(body)
+        self.code = 200
+        self.headers = {}
+        self._in = {k.lower(): v for k, v in (headers or {}).items()}
+
+    def setHeader(self, name, value):
+        self.headers[name.lower()] = value
+
+    def setResponseCode(self, code):
+        self.code = code
+
+    def getHeader(self, name):
+        return self._in.get(name.lower())
+
+
+def test_intarg():
+    assert _intarg({}, b"version") is None
+    assert _intarg({b"version": [b"3"]}, b"version") == 3
+    for bad in (b"", b"x", b"1.5"):
+        with pytest.raises(BadRequest, match="version must be integer"):
+            _intarg({b"version": [bad]}, b"version")
+
+
+def test_flagarg():
+    for val in (b"1", b"true", b"yes"):
+        assert _flagarg({b"template": [val]}, b"template")
+    for val in (b"0", b"", b"no", b"True"):
+        assert not _flagarg({b"template": [val]}, b"template")
+    assert not _flagarg({}, b"template")
+
+
+def test_finish_get_raw_with_etag():
+    etag = make_etag(RAW)
+    req = FakeRequest()
+    assert _finish_get((RAW, etag), req) == RAW
+    assert req.code == 200
+    assert req.headers[b"etag"] == etag
+    assert req.headers[b"content-length"] == b"%d" % len(RAW)
+
+
+def test_finish_get_not_modified():
+    etag = make_etag(RAW)
+    req = FakeRequest(headers={b"If-None-Match": etag})
+    assert _finish_get((RAW, etag), req) == b""
+    assert req.code == 304
+
+
+def test_finish_get_template_ignores_etag():
+    etag = make_etag(RAW)
+    req = FakeRequest(
+        args={b"template": [b"yes"]},
+        headers={b"If-None-Match": etag},
+        body=b'{"u": "Alice"}',
+    )
+    out = _finish_get((RAW, etag), req)
+    assert req.code == 200
+    assert b'"greet":"Alice"' in out
+    assert b"etag" not in req.headers
@@ -0,0 +1,21 @@
+from app.cache import LRUCache, etag_matches, make_etag
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(2)
+    cache.put(("svc", 1), "a")
+    cache.put(("svc", 2), "b")
+    assert cache.get(("svc", 1)) == "a"
+    cache.put(("svc", 3), "c")
+    assert cache.get(("svc", 2)) is None
+    assert cache.get(("svc", 1)) == "a"
+    assert len(cache) == 2
+
+
+def test_etag_matches():
+    etag = make_etag(b'{"a": 1}')
+    assert etag_matches(etag, etag)
+    assert etag_matches(b'"x", W/' + etag, etag)
+    assert etag_matches(b"*", etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches(make_etag(b"{}"), etag)
@@ -0,0 +1,49 @@
+import json
+
+import pytest
+
+from app import jsonutil
+from app.templating import render_config
+
+BIG = 123456789012345678901234567890
+
+
+def _nested(depth):
+    doc = leaf = {}
+    for _ in range(depth):
+        leaf["a"] = {}
+        leaf = leaf["a"]
+    return doc
+
+
+def test_dumps_big_int():
+    assert jsonutil.dumps({"big": BIG}) == b'{"big":%d}' % BIG
+
+
+def test_dumps_deep_nesting():
+    doc = _nested(300)
+    assert json.loads(jsonutil.dumps(doc)) == doc
+
+
+def test_dumps_non_str_keys():
+    out = jsonutil.dumps({1: "a", "b": "й"})
+    assert out == '{"1":"a","b":"й"}'.encode()
+
+
+def test_loads_keeps_big_int():
+    raw = b'{"big": %d, "neg": -9223372036854775809}' % BIG
+    doc = jsonutil.loads(raw)
+    assert doc == {"big": BIG, "neg": -9223372036854775809}
+    assert type(doc["big"]) is int
+
+
+def test_loads_invalid():
+    with pytest.raises(json.JSONDecodeError):
+        jsonutil.loads(b"{")
+    with pytest.raises(json.JSONDecodeError):
+        jsonutil.loads(b'{"a": 12345678901234567890, "b": "\xff"}')
+
+
+def test_render_keeps_big_int():
+    out = render_config({"big": BIG, "name": "{{ user }}"}, {"user": "A"})
+    assert out == {"big": BIG, "name": "A"}
@@ -0,0 +1,78 @@
+import pytest
+
+from app import templating
+from app.templating import render_config
+
+
+def test_render_nested():
+    doc = {
+        "name": "{{ user }}",
+        "db": {"hosts": ["{{ host }}", "static", 5432]},
+        "flags": [{"on": "{% if on %}yes{% endif %}"}],
+        "port": 5432,
+    }
+    out = render_config(doc, {"user": "Alice", "host": "db", "on": True})
+    assert out == {
+        "name": "Alice",
+        "db": {"hosts": ["db", "static", 5432]},
+        "flags": [{"on": "yes"}],
+        "port": 5432,
+    }
+    assert doc["name"] == "{{ user }}"
+
+
+def test_no_templates_returned_as_is():
+    doc = {"db": {"host": "db", "port": 5432}}
+    assert render_config(doc, {}) is doc
+
+
+def test_undefined_variable():
+    with pytest.raises(ValueError):
+        render_config({"name": "{{ user }}"}, {})
+
+
+def test_subtree_without_templates_is_shared():
+    static = {"hosts": ["a", "b"], "port": 5432}
+    doc = {"name": "{{ user }}", "db": static}
+    out = render_config(doc, {"user": "Alice"})
+    assert out == {"name": "Alice", "db": static}
+    assert out["db"] is static
+
+
+def test_include_is_not_available():
+    doc = {"name": "{% include t %}"}
+    with pytest.raises(TypeError, match="no loader"):
+        render_config(doc, {"t": "{{ 7 * 7 }}"})
+
+
+@pytest.fixture
+def bcc_dir(tmp_path, monkeypatch):
+    settings = templating.settings
+    monkeypatch.setattr(settings, "jinja_bcc_dir", str(tmp_path))
+    templating._bytecode_cache.cache_clear()
+    yield tmp_path
+    templating._bytecode_cache.cache_clear()
+
+
+def test_warm_templates_persists_bytecode(bcc_dir, monkeypatch):
+    templating.warm_templates({"a": ["{{ warm_one }}", "{% if %}"]})
+    assert len(list(bcc_dir.iterdir())) == 1
+    monkeypatch.setattr(templating.settings, "jinja_bcc_max_files", 1)
+    templating.warm_templates({"a": "{{ warm_two }}"})
+    assert len(list(bcc_dir.iterdir())) == 1
+
+
+def test_group_writable_bcc_dir_is_refused(bcc_dir):
+    bcc_dir.chmod(0o777)
+    assert templating._bytecode_cache() is None
+    assert render_config({"a": "{{ x }}"}, {"x": 1}) == {"a": "1"}
+
+
+def test_unavailable_bcc_dir_disables_cache(monkeypatch):
+    monkeypatch.setattr(templating.settings, "jinja_bcc_dir", "/proc/nope")
+    templating._bytecode_cache.cache_clear()
+    try:
+        assert templating._bytecode_cache() is None
+        templating.warm_templates({"a": "{{ warm_three }}"})
+    finally:
+        templating._bytecode_cache.cache_clear()
@@ -1,10 +1,52 @@
+import yaml
+
 from app.validation import validate_config_payload
 
+
 def test_ok():
     doc = {"version": 1, "database": {"host": "db", "port": 5432}}
     assert validate_config_payload(doc) == []
 
+
 def test_missing():
     doc = {"database": {"port": 5432}}
     errs = validate_config_payload(doc)
     assert "Missing required field: database.host" in errs
+
+
+def test_invalid_types_and_values():
+    doc = {"version": "1", "database": {"host": " ", "port": 70000}}
+    assert validate_config_payload(doc) == [
+        "Invalid type for version: expected int",
+        "Invalid database.port: must be 1..65535",
+        "Invalid database.host: must be non-empty string",
+    ]
+
+
+def test_database_not_mapping():
+    errs = validate_config_payload({"database": "db"})
+    assert errs == [
+        "Missing required field: database.host",
+        "Missing required field: database.port",
+    ]
+
+
+def test_bool_port_rejected():
+    # Схема строгая: bool больше не считается int (раньше True
+    # проходил проверку, а False давал ошибку диапазона).
+    for port in (True, False):
+        doc = {"database": {"host": "db", "port": port}}
+        assert validate_config_payload(doc) == [
+            "Invalid type for database.port: expected int",
+        ]
+
+
+def test_non_finite_floats_rejected():
+    doc = yaml.safe_load(
+        "database: {host: db, port: 5432}\n"
+        "limits: {a: .inf, b: [1.5, .nan]}\n"
+    )
+    assert validate_config_payload(doc) == [
+        "Invalid value for limits.a: must be a finite number",
+        "Invalid value for limits.b.1: must be a finite number",
+    ]